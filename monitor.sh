@@ -4,7 +4,7 @@
 # + Alert system (CPU/RAM/Disk) + alerts log
 # Outputs:
 #   out/metrics.json   (latest snapshot)
-#   out/metrics.jsonl  (history, JSONL)
+#   out/metrics.jsonl  (history, JSONL; rotated to out/metrics.<epoch>.jsonl at HISTORY_MAX_BYTES)
 #   out/alerts.log     (alerts history)
 
 set -euo pipefail
@@ -12,6 +12,7 @@ set -euo pipefail
 OUTPUT_DIR="${OUTPUT_PATH:-out}"
 LATEST_FILE="${OUTPUT_DIR}/metrics.json"
 HISTORY_FILE="${OUTPUT_DIR}/metrics.jsonl"
+HISTORY_MAX_BYTES="${HISTORY_MAX_BYTES:-10485760}"   # rotate history past this size (0 = never)
 
 INTERVAL=3
 COUNT=0                 # 0 = infinite
@@ -55,6 +56,17 @@ alerts_to_json() {
   echo "$out"
 }
 
+# Rotation convention (server.py reads it): metrics.jsonl -> metrics.<epoch>.jsonl,
+# rotated segments are never written again
+rotate_history() {
+  (( HISTORY_MAX_BYTES > 0 )) || return 0
+  local size
+  size="$(stat -c %s "$HISTORY_FILE" 2>/dev/null || echo 0)"
+  if (( size >= HISTORY_MAX_BYTES )); then
+    mv -f "$HISTORY_FILE" "${OUTPUT_DIR}/metrics.$(date +%s).jsonl"
+  fi
+}
+
 is_wsl() {
   grep -qi "microsoft" /proc/sys/kernel/osrelease 2>/dev/null
 }
@@ -593,6 +605,7 @@ print(json.dumps(json.loads(s), separators=(",",":"), ensure_ascii=False))' <<<
 
 
 echo "$COMPACT" >> "$HISTORY_FILE"
+rotate_history
 
   echo "Updated: $LATEST_FILE (history appended to $HISTORY_FILE)"
 
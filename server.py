@@ -3,6 +3,7 @@
 # - Serves dashboard from ./web
 # - Serves latest metrics from ./out/metrics.json
 # - Serves history from ./out/metrics.jsonl (supports real JSONL AND multi-line JSON objects)
+#   plus rotated segments ./out/metrics.<epoch>.jsonl written by monitor.sh
 # Endpoints:
 #   GET /                  -> web/index.html
 #   GET /api/latest         -> latest snapshot JSON
@@ -11,14 +12,33 @@
 #   GET /api/history.jsonl?n=50 -> download last N records as JSONL
 #   GET /api/health         -> {"ok":true,...}
 
+import asyncio
+import codecs
+import email.utils
+import functools
+import gzip
 import http.server
-import socketserver
 import json
 import os
+import re
+import socket
+import stat
+import sys
 import urllib.parse
 import mimetypes
+import multiprocessing
 import threading
-from typing import List, Dict, Any, Optional
+import time
+import traceback
+from collections import OrderedDict, deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Deque, List, Dict, Any, Optional, Tuple
+
+try:
+    import orjson  # optional, much faster parse/serialize
+except ImportError:
+    orjson = None
 
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 OUT_DIR = os.environ.get("OUTPUT_PATH", os.path.join(BASE_DIR, "out"))
@@ -26,289 +46,910 @@ WEB_DIR = os.path.join(BASE_DIR, "web")
 
 HOST = "0.0.0.0"
 PORT = 5000
+RENDER_WORKERS = int(os.environ.get("RENDER_WORKERS", "2"))  # 0 = render in the loop's thread pool
+KEEPALIVE_TIMEOUT = 15  # idle keep-alive connections are closed after this many seconds
+LISTEN_BACKLOG = socket.SOMAXCONN  # the loop accepts between requests, so let the kernel queue bursts
+GZIP_LEVEL = 1
+HEALTH_TTL = 1.0
+SNDBUF_SIZE = 256 * 1024
 
 LATEST_PATH = os.path.join(OUT_DIR, "metrics.json")
 HISTORY_PATH = os.path.join(OUT_DIR, "metrics.jsonl")
 
 
+# -----------------------------
+# JSON helpers (orjson if installed)
+# -----------------------------
+if orjson is not None:
+    json_loads = orjson.loads
+
+    def json_dumps_bytes(obj: Any) -> bytes:
+        return orjson.dumps(obj)
+else:
+    json_loads = json.loads
+
+    def json_dumps_bytes(obj: Any) -> bytes:
+        return json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
 # -----------------------------
 # File helpers (safe-ish reads)
 # -----------------------------
+STAT_TTL_BUCKETS = 5  # buckets per second: cached stat results live ~200 ms
+
+
+def _ttl_bucket() -> int:
+    return int(time.monotonic() * STAT_TTL_BUCKETS)
+
+
+@functools.lru_cache(maxsize=256)
+def _stat_cached(path: str, bucket: int) -> Tuple[bool, int, int]:
+    try:
+        st = os.stat(path)
+    except OSError:
+        return (False, 0, 0)
+    return (True, st.st_size, st.st_mtime_ns)
+
+
+def stat_cached(path: str) -> Tuple[bool, int, int]:
+    """(exists, size, mtime_ns) of path, at most ~200 ms old (misses are cached too)."""
+    return _stat_cached(path, _ttl_bucket())
+
+
 def read_file_bytes(path: str) -> Optional[bytes]:
-    if not os.path.exists(path):
+    # raw fd: no BufferedIO object, no lseek/isatty probes, just open + fstat + read + close
+    try:
+        fd = os.open(path, os.O_RDONLY)
+    except OSError:
         return None
     try:
-        with open(path, "rb") as f:
-            return f.read()
+        size = os.fstat(fd).st_size
+        data = os.read(fd, size)
+        while len(data) < size:
+            chunk = os.read(fd, size - len(data))
+            if not chunk:  # truncated while reading
+                break
+            data += chunk
+        return data
     except Exception:
         return None
+    finally:
+        os.close(fd)
+
+
+# (st_mtime_ns, st_size, data) of the last good LATEST_PATH read, shared by the loop and its thread pool
+_LATEST_CACHE: Optional[Tuple[int, int, bytes]] = None
 
 
 def read_latest_json_bytes() -> Optional[bytes]:
     """
     Try reading latest JSON bytes. If file is mid-write, try a couple times.
+
+    Polls between monitor.sh writes get the same cached bytes object (keyed by mtime/size)
+    instead of a fresh read + allocation per request.
     """
+    global _LATEST_CACHE
     for _ in range(3):
+        try:
+            st = os.stat(LATEST_PATH)
+        except OSError:
+            return None
+        cached = _LATEST_CACHE
+        if cached and cached[0] == st.st_mtime_ns and cached[1] == st.st_size:
+            return cached[2]
         data = read_file_bytes(LATEST_PATH)
         if not data:
             return None
         # quick sanity: must contain '{' and '}'
         if b"{" in data and b"}" in data:
+            if len(data) == st.st_size:
+                _LATEST_CACHE = (st.st_mtime_ns, st.st_size, data)
             return data
     return None
 
 
+# (time.monotonic(), body) of the last /api/health body; replaced as a whole, so races are benign
+_HEALTH: Tuple[float, bytes] = (0.0, b"")
+
+
+def health_json_bytes() -> bytes:
+    """/api/health body, rebuilt at most once per HEALTH_TTL seconds."""
+    global _HEALTH
+    now = time.monotonic()
+    t, body = _HEALTH
+    if not body or now - t > HEALTH_TTL:
+        body = json_dumps_bytes({
+            "ok": True,
+            "latest_exists": os.path.exists(LATEST_PATH),
+            "history_exists": os.path.exists(HISTORY_PATH),
+            "latest_path": LATEST_PATH,
+            "history_path": HISTORY_PATH,
+        })
+        _HEALTH = (now, body)
+    return body
+
+
 # -----------------------------------------
 # History parsing (supports "bad" history)
 # -----------------------------------------
-def parse_history_objects(path: str, max_items: int = 50) -> List[Dict[str, Any]]:
-    """
-    Reads up to max_items most recent JSON objects from HISTORY_PATH.
+TAIL_CHUNK = 64 * 1024
+SCAN_CHUNK = 1 << 20
+DEEP_FAIL = 4 * 1024  # chars a failed decode may walk before braces get indexed
 
-    Supports:
-    1) Proper JSONL: 1 JSON object per line
-    2) Multi-line JSON objects concatenated (your current broken file case)
-       We parse by scanning text and extracting complete JSON objects with JSONDecoder.raw_decode.
+HIST_CACHE_SIZE = 32
 
-    Returns list of dicts in chronological order (old -> new) of the last max_items.
+# (kind, path, (st_mtime_ns, st_size), max_items) -> parsed items / serialized body
+_HIST_CACHE: "OrderedDict[Tuple[Any, ...], Any]" = OrderedDict()
+_HIST_LOCK = threading.Lock()
+
+
+def _cache_get(key: Tuple[Any, ...]) -> Any:
+    with _HIST_LOCK:
+        val = _HIST_CACHE.get(key)
+        if val is not None:
+            _HIST_CACHE.move_to_end(key)
+        return val
+
+
+def _cache_put(key: Tuple[Any, ...], val: Any) -> None:
+    with _HIST_LOCK:
+        _HIST_CACHE[key] = val
+        _HIST_CACHE.move_to_end(key)
+        while len(_HIST_CACHE) > HIST_CACHE_SIZE:
+            _HIST_CACHE.popitem(last=False)
+
+
+def history_segments(path: str) -> List[str]:
     """
-    if not os.path.exists(path):
-        return []
+    The live history file plus its rotated segments, newest first.
 
+    Rotation convention (see monitor.sh): once metrics.jsonl reaches HISTORY_MAX_BYTES it
+    is renamed to metrics.<unix epoch>.jsonl and a fresh metrics.jsonl is started.
+    Rotated segments are never written again.
+    """
+    folder, name = os.path.split(path)
+    stem, ext = os.path.splitext(name)
+    prefix = stem + "."
     try:
-        with open(path, "r", encoding="utf-8", errors="replace") as f:
-            text = f.read()
-    except Exception:
-        return []
+        names = os.listdir(folder or ".")
+    except OSError:
+        names = []
+    rotated = []
+    for n in names:
+        if n.startswith(prefix) and n.endswith(ext):
+            epoch = n[len(prefix):len(n) - len(ext)]
+            if epoch.isdigit():
+                rotated.append((int(epoch), n))
+    rotated.sort(reverse=True)
+    return [path] + [os.path.join(folder, n) for _, n in rotated]
+
+
+def history_stat_key(path: str) -> Optional[Tuple[Any, ...]]:
+    """
+    (st_mtime_ns, st_size, rotated segment names) for the history, or None if there is none.
+    Rotated segments are immutable, so their names are enough to detect changes.
+    """
+    segments = history_segments(path)
+    try:
+        st = os.stat(path)
+    except OSError:
+        if len(segments) == 1:
+            return None
+        return (0, 0, tuple(segments[1:]))
+    return (st.st_mtime_ns, st.st_size, tuple(segments[1:]))
 
-    text = text.strip()
-    if not text:
-        return []
 
+def _tail_jsonl(f, size: int, max_items: int) -> Tuple[List[Dict[str, Any]], int]:
+    """
+    Read JSONL records backwards from the end of an open binary file, 64 KiB at a time,
+    until max_items objects are collected. Only the tail of the file is ever read.
+
+    Returns (items, head): head is 0 when the walk finished cleanly, otherwise the byte
+    offset just past the first line that did not parse (multi-line objects). Only
+    [0, head) is left for the slow path; everything after it is already in items.
+    """
     items: List[Dict[str, Any]] = []
+    pos = size
+    rest = b""
+    while pos > 0 and len(items) < max_items:
+        step = min(TAIL_CHUNK, pos)
+        pos -= step
+        f.seek(pos)
+        buf = f.read(step) + rest
+        start = 0
+        if pos > 0:
+            # first piece may be the end of a line that starts in an earlier chunk
+            nl = buf.find(b"\n")
+            if nl == -1:
+                rest = buf
+                continue
+            rest = buf[:nl]
+            start = nl + 1
+        end = len(buf)
+        while end > start and len(items) < max_items:
+            nl = buf.rfind(b"\n", start, end)
+            ln = buf[nl + 1 if nl != -1 else start:end].strip()
+            if ln:
+                try:
+                    obj = json_loads(ln)
+                except (ValueError, RecursionError):  # stdlib json: nested too deep
+                    items.reverse()
+                    return items, pos + end
+                if isinstance(obj, dict):
+                    items.append(obj)
+            end = nl if nl != -1 else start
+    items.reverse()
+    return items, 0
 
-    # Fast path: JSONL (try line-by-line)
-    lines = [ln.strip() for ln in text.splitlines() if ln.strip()]
-    jsonl_ok = True
-    tmp: List[Dict[str, Any]] = []
-    for ln in lines[-min(len(lines), max_items * 5):]:  # look at recent portion
-        if not (ln.startswith("{") and ln.endswith("}")):
-            jsonl_ok = False
-            break
-        try:
-            obj = json.loads(ln)
-            if isinstance(obj, dict):
-                tmp.append(obj)
-            else:
-                jsonl_ok = False
-                break
-        except Exception:
-            jsonl_ok = False
-            break
 
-    if jsonl_ok and tmp:
-        # But tmp might be only the last chunk; load whole file JSONL safely:
-        items = []
-        for ln in lines:
-            if not (ln.startswith("{") and ln.endswith("}")):
+# lines holding a brace, and the characters the brace matcher cares about on them
+_BRACE_LINE = re.compile(r"^[^\n{}]*[{}].*$", re.M)
+_STRUCTURAL = re.compile(r'[{}"\\]')
+# '{' where a top-level record can start: at a line start, or right after a '}'
+_RECORD_START = re.compile(r"^\{|\}[ \t\r\n]*\{", re.M)
+
+
+def _brace_matches(text: str) -> Dict[int, int]:
+    """
+    Map the index of every '{' in text to the index just past its matching '}'.
+    Braces that never close are left out.
+
+    One stack-based pass that tracks strings, so braces inside strings don't count. A JSON
+    string can't contain a raw newline, so string state resets at each line end and a stray
+    '"' only affects its own line. Only lines holding a brace are visited.
+    """
+    matches: Dict[int, int] = {}
+    stack: List[int] = []
+    for line in _BRACE_LINE.finditer(text):
+        in_str = False
+        skip = -1
+        for m in _STRUCTURAL.finditer(text, line.start(), line.end()):
+            i = m.start()
+            if i == skip:
                 continue
+            c = m.group()
+            if in_str:
+                if c == "\\":
+                    skip = i + 1  # escaped character
+                elif c == '"':
+                    in_str = False
+            elif c == '"':
+                in_str = True
+            elif c == "{":
+                stack.append(i)
+            elif c == "}" and stack:
+                matches[stack.pop()] = i + 1
+    return matches
+
+
+def _record_inside(buf: str, start: int, end: int, dec: json.JSONDecoder,
+                   starts: Dict[int, bool]) -> bool:
+    """
+    True if a record-start '{' strictly between start and end decodes. Each position is
+    decoded at most once per buffer (results are kept in starts).
+    """
+    for m in _RECORD_START.finditer(buf, start + 1, end):
+        k = m.end() - 1
+        ok = starts.get(k)
+        if ok is None:
             try:
-                obj = json.loads(ln)
+                dec.raw_decode(buf, k)
+                ok = True
+            except (json.JSONDecodeError, RecursionError):
+                ok = False
+            starts[k] = ok
+        if ok:
+            return True
+    return False
+
+
+def _scan_concatenated(f, limit: int, max_items: int) -> List[Dict[str, Any]]:
+    """
+    Slow path: stream bytes [0, limit) of an open binary file in 1 MiB chunks and extract
+    complete JSON objects with JSONDecoder.raw_decode, keeping only the last max_items.
+
+    A decode that fails shortly after its '{' just moves on one character. Once a decode
+    fails deep into the text (e.g. a run of nested '{' that never close), the buffer's
+    brace matches are built once: from then on a '{' that never closes is skipped without
+    decoding it and a malformed object is skipped whole, so garbage costs linear time.
+    A match is only used as a skip when no valid record starts inside it: a stray '}' can
+    pair with an unclosed '{' from much earlier.
+
+    Peak memory is ~1 MiB + max_items records regardless of file size.
+    """
+    items: Deque[Dict[str, Any]] = deque(maxlen=max_items)
+    dec = json.JSONDecoder()
+    utf8 = codecs.getincrementaldecoder("utf-8")(errors="replace")
+    f.seek(0)
+    remaining = limit
+    buf = ""
+    eof = False
+    while not eof:
+        chunk = f.read(min(SCAN_CHUNK, remaining))
+        remaining -= len(chunk)
+        eof = not chunk or remaining <= 0
+        buf += utf8.decode(chunk, final=eof)
+
+        # scan for objects
+        idx = 0
+        matches: Optional[Dict[int, int]] = None
+        starts: Dict[int, bool] = {}
+        while True:
+            # find next '{'
+            j = buf.find("{", idx)
+            if j == -1:
+                idx = len(buf)
+                break
+            if matches is not None and j not in matches:
+                # never closes in buf
+                if not eof and len(buf) - j <= SCAN_CHUNK:
+                    # object cut by the chunk boundary: wait for more data
+                    idx = j
+                    break
+                idx = j + 1
+                continue
+            try:
+                obj, end = dec.raw_decode(buf, j)
+            except json.JSONDecodeError as e:
+                err = e.pos
+            except RecursionError:
+                err = -1  # nested too deep to decode
+            else:
+                idx = end
                 if isinstance(obj, dict):
                     items.append(obj)
-            except Exception:
-                pass
-        return items[-max_items:]
+                continue
 
-    # Slow path: parse concatenated JSON objects (handles multi-line)
-    dec = json.JSONDecoder()
-    idx = 0
-    n = len(text)
-
-    # scan for objects
-    while idx < n:
-        # find next '{'
-        j = text.find("{", idx)
-        if j == -1:
-            break
-        try:
-            obj, end = dec.raw_decode(text, j)
-            idx = end
-            if isinstance(obj, dict):
-                items.append(obj)
-        except Exception:
-            # move forward 1 char and try again
-            idx = j + 1
+            if not eof and err > buf.rfind("\n") and len(buf) - j <= SCAN_CHUNK:
+                # failed on the last line: object cut by the chunk boundary, wait for more data
+                idx = j
+                break
+            if matches is not None:
+                end = matches[j]
+                if _record_inside(buf, j, end, dec, starts):
+                    # the '}' pairs with an unclosed '{' across valid records (e.g. a stray
+                    # '}' after a truncated object): don't skip them, treat j as never closing
+                    del matches[j]
+                    idx = j + 1
+                else:
+                    # closes but isn't valid JSON: jump past all of it in one step
+                    idx = end
+            elif err == -1 or err - j > DEEP_FAIL:
+                # decoding walked far before failing: index the braces once so the '{'s
+                # it walked past aren't decoded again one by one, then retry j
+                matches = _brace_matches(buf)
+            else:
+                # move forward 1 char and try again
+                idx = j + 1
+        buf = buf[idx:]
+    return list(items)
 
-    return items[-max_items:]
+
+def _parse_history_file(path: str, max_items: int) -> List[Dict[str, Any]]:
+    """
+    Last max_items objects of one history file (see parse_history_objects).
+    Cached by (mtime, size, max_items); callers must not mutate the returned list.
+    The cache is per process: with the render pool on, entries live in the pool workers
+    and the server process only fills its own on the in-process fallback.
+    """
+    try:
+        # unbuffered: every read below is an explicit 64 KiB / 1 MiB chunk
+        with open(path, "rb", buffering=0) as f:
+            st = os.fstat(f.fileno())
+            key = ("items", path, (st.st_mtime_ns, st.st_size), max_items)
+            cached = _cache_get(key)
+            if cached is not None:
+                return cached
+
+            items, head = _tail_jsonl(f, st.st_size, max_items)
+            if head and len(items) < max_items:
+                items = _scan_concatenated(f, head, max_items - len(items)) + items
+    except Exception:
+        return []
+
+    _cache_put(key, items)
+    return items
+
+
+def parse_history_objects(path: str, max_items: int = 50) -> List[Dict[str, Any]]:
+    """
+    Reads up to max_items most recent JSON objects from HISTORY_PATH.
+
+    Supports:
+    1) Proper JSONL: 1 JSON object per line (read backwards from the end, O(max_items))
+    2) Multi-line JSON objects concatenated (your current broken file case)
+       We stream the text and extract complete JSON objects with JSONDecoder.raw_decode.
+       Only the part of the file before the JSONL tail is scanned, never the same bytes twice.
+    3) Rotated segments (metrics.<epoch>.jsonl): the live file is read first and older
+       segments only while fewer than max_items records have been found, so the work is
+       bounded by one segment no matter how much history has piled up.
+
+    Results are cached per file by (mtime, size, max_items) so repeated polls of an
+    unchanged file do no I/O.
+
+    Returns list of dicts in chronological order (old -> new) of the last max_items.
+    """
+    items: List[Dict[str, Any]] = []
+    for segment in history_segments(path):
+        need = max_items - len(items)
+        if need <= 0:
+            break
+        items = _parse_history_file(segment, need) + items
+    return items
 
 
 def to_jsonl_bytes(items: List[Dict[str, Any]]) -> bytes:
-    lines = [json.dumps(it, ensure_ascii=False, separators=(",", ":")) for it in items]
-    return ("\n".join(lines) + ("\n" if lines else "")).encode("utf-8")
+    buf = bytearray()
+    for it in items:
+        buf += json_dumps_bytes(it)
+        buf += b"\n"
+    return bytes(buf)
+
+
+def to_history_json_bytes(items: List[Dict[str, Any]]) -> bytes:
+    return json_dumps_bytes({"count": len(items), "items": items})
+
+
+# -----------------------------------------
+# History rendering (off the event loop)
+# -----------------------------------------
+_RENDERERS = {"json": to_history_json_bytes, "jsonl": to_jsonl_bytes}
+
+# None = not started yet, False = unavailable (render in-process)
+_RENDER_POOL: Any = None
+_RENDER_POOL_LOCK = threading.Lock()
+
+
+def _render_history(kind: str, path: str, n: int) -> bytes:
+    # parse + serialize in one call: only the finished bytes cross the process boundary
+    return _RENDERERS[kind](parse_history_objects(path, max_items=n))
+
+
+def render_history(kind: str, path: str, n: int) -> bytes:
+    """
+    Render the last n history records as "json" or "jsonl" bytes on a small process
+    pool, so parse/serialize CPU doesn't hold the GIL the event loop needs.
+    Falls back to rendering in this process if the pool is disabled or can't start.
+    """
+    global _RENDER_POOL
+    with _RENDER_POOL_LOCK:
+        if _RENDER_POOL is None:
+            _RENDER_POOL = False
+            if RENDER_WORKERS > 0:
+                try:
+                    _RENDER_POOL = ProcessPoolExecutor(
+                        max_workers=RENDER_WORKERS, mp_context=multiprocessing.get_context("spawn"))
+                except Exception as e:
+                    print(f"Render pool unavailable, rendering in-process: {e}")
+        pool = _RENDER_POOL
+    if pool:
+        try:
+            return pool.submit(_render_history, kind, path, n).result()
+        except (BrokenProcessPool, OSError) as e:
+            print(f"Render pool broken, rendering in-process: {e}")
+            with _RENDER_POOL_LOCK:
+                if _RENDER_POOL is pool:
+                    _RENDER_POOL = False
+    return _render_history(kind, path, n)
+
+
+def shutdown_render_pool():
+    """Stop the render pool's worker processes (if one was started)."""
+    global _RENDER_POOL
+    with _RENDER_POOL_LOCK:
+        pool, _RENDER_POOL = _RENDER_POOL, False
+    if pool:
+        pool.shutdown()
 
 
 # -----------------------------
 # HTTP handler
 # -----------------------------
-class RequestHandler(http.server.BaseHTTPRequestHandler):
-    server_version = "SystemMonitorHTTP/1.1"
+# Headers identical on every response, pre-built once
+_STATIC_HDR = (
+    # prevent caching (important for live dashboards)
+    b"Cache-Control: no-store, no-cache, must-revalidate, max-age=0\r\n"
+    b"Pragma: no-cache\r\n"
+    b"Expires: 0\r\n"
+    # CORS (local safe)
+    b"Access-Control-Allow-Origin: *\r\n"
+)
 
-    def log_message(self, fmt, *args):
-        print("%s - - [%s] %s" % (self.client_address[0], self.log_date_time_string(), fmt % args))
+# (epoch second, formatted Date header value)
+_HTTP_DATE: Tuple[int, bytes] = (0, b"")
 
-    def _send_response(self, code: int, body: bytes = b"", content_type: str = "application/json",
-                       extra_headers: Optional[Dict[str, str]] = None):
-        self.send_response(code)
-        self.send_header("Content-Type", content_type)
-        self.send_header("Content-Length", str(len(body)))
 
-        # prevent caching (important for live dashboards)
-        self.send_header("Cache-Control", "no-store, no-cache, must-revalidate, max-age=0")
-        self.send_header("Pragma", "no-cache")
-        self.send_header("Expires", "0")
+def http_date() -> bytes:
+    """RFC 7231 Date header value, formatted at most once per second."""
+    global _HTTP_DATE
+    now = int(time.time())
+    if _HTTP_DATE[0] != now:
+        _HTTP_DATE = (now, email.utils.formatdate(now, usegmt=True).encode("ascii"))
+    return _HTTP_DATE[1]
 
-        # CORS (local safe)
-        self.send_header("Access-Control-Allow-Origin", "*")
 
+# (status code, content type) -> header block template, built on first use.
+# Only Date and Content-Length are filled in per response: template % (date, length)
+_HEADER_TEMPLATES: Dict[Tuple[int, str], bytes] = {}
+
+
+class RequestHandler:
+    """
+    One client connection, served on the asyncio event loop.
+
+    Requests are read off the StreamReader and dispatched to do_<METHOD> and the route
+    tables below; responses go to the StreamWriter. Idle keep-alive connections cost a
+    suspended coroutine, not a thread. Work that can block for long (history rendering,
+    gzip) runs in the loop's default thread pool.
+    """
+    server_version = "SystemMonitorHTTP/1.1"
+    sys_version = "Python/" + sys.version.split()[0]
+    # keep-alive: every response carries Content-Length
+    protocol_version = "HTTP/1.1"
+
+    # status phrases and access-log format, shared with http.server
+    responses = http.server.BaseHTTPRequestHandler.responses
+    monthname = http.server.BaseHTTPRequestHandler.monthname
+    version_string = http.server.BaseHTTPRequestHandler.version_string
+    log_date_time_string = http.server.BaseHTTPRequestHandler.log_date_time_string
+    log_request = http.server.BaseHTTPRequestHandler.log_request
+
+    def __init__(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.reader = reader
+        self.writer = writer
+        self.connection = writer.get_extra_info("socket")
+        self.client_address = writer.get_extra_info("peername") or ("-", 0)
+        self.requestline = ""
+        self.command = ""
+        self.path = ""
+        self.headers: Dict[str, str] = {}
+        self.close_connection = True
+
+    async def handle(self):
+        """Serve requests on this connection until the client or a response closes it."""
+        self.setup()
+        loop = asyncio.get_running_loop()
+        try:
+            while True:
+                # idle timeout: a plain timer that drops the connection (wait_for would
+                # wrap every read in a new Task)
+                idle = loop.call_later(KEEPALIVE_TIMEOUT, self.writer.transport.abort)
+                try:
+                    head = await self.reader.readuntil(b"\r\n\r\n")
+                except asyncio.LimitOverrunError:
+                    self.requestline = ""
+                    self.close_connection = True
+                    self._send_response(431, b"Request Header Fields Too Large", content_type="text/plain")
+                    await self.writer.drain()
+                    break
+                except (asyncio.IncompleteReadError, ConnectionError):
+                    break
+                finally:
+                    idle.cancel()
+                if self.parse_request(head):
+                    method = getattr(self, "do_" + self.command, None)
+                    if method is None:
+                        self._send_response(501, ("Unsupported method (%r)" % self.command).encode("latin-1"),
+                                            content_type="text/plain")
+                    else:
+                        await method()
+                await self.writer.drain()
+                if self.close_connection:
+                    break
+        except ConnectionError:
+            pass
+        except Exception:
+            # as socketserver's handle_error: report it and drop this connection only
+            print(f"Exception occurred during processing of request from {self.client_address}")
+            traceback.print_exc()
+        finally:
+            self.writer.close()
+
+    def parse_request(self, head: bytes) -> bool:
+        """
+        Parse the request line and headers (header names are lower-cased) and decide
+        keep-alive. On a malformed request a 400 is queued and False returned.
+        """
+        lines = head.decode("latin-1").lstrip("\r\n").split("\r\n")
+        self.requestline = lines[0]
+        words = self.requestline.split()
+        if len(words) != 3 or not words[2].startswith("HTTP/1."):
+            self.close_connection = True
+            self._send_response(400, b"Bad Request", content_type="text/plain")
+            return False
+        self.command, self.path, version = words
+
+        headers: Dict[str, str] = {}
+        for line in lines[1:]:
+            name, sep, value = line.partition(":")
+            if sep:
+                name = name.strip().lower()
+                value = value.strip()
+                headers[name] = headers[name] + ", " + value if name in headers else value
+        self.headers = headers
+
+        conn = headers.get("connection", "").lower()
+        if version == "HTTP/1.0":
+            self.close_connection = "keep-alive" not in conn
+        else:
+            self.close_connection = "close" in conn
+        # request bodies are never read, so nothing can follow one on this connection
+        if headers.get("content-length", "0") != "0" or "transfer-encoding" in headers:
+            self.close_connection = True
+        return True
+
+    def setup(self):
+        # small JSON responses must not wait on Nagle; bigger send buffer for static assets
+        if self.connection is None:
+            return
+        try:
+            self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            self.connection.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, SNDBUF_SIZE)
+        except OSError:
+            pass
+
+    def _set_cork(self, on: bool):
+        if self.connection is None or not hasattr(socket, "TCP_CORK"):  # Linux only
+            return
+        try:
+            self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_CORK, 1 if on else 0)
+        except OSError:
+            pass
+
+    def log_message(self, fmt, *args):
+        print("%s - - [%s] %s" % (self.client_address[0], self.log_date_time_string(), fmt % args))
+
+    def _header_template(self, code: int, content_type: str) -> bytes:
+        tpl = _HEADER_TEMPLATES.get((code, content_type))
+        if tpl is None:
+            fixed = "%s %d %s\r\nServer: %s\r\nContent-Type: %s\r\n" % (
+                self.protocol_version, code, self.responses.get(code, ("",))[0],
+                self.version_string(), content_type,
+            )
+            tpl = (fixed.encode("latin-1").replace(b"%", b"%%") + _STATIC_HDR
+                   + b"Date: %s\r\nContent-Length: %d\r\n")
+            _HEADER_TEMPLATES[(code, content_type)] = tpl
+        return tpl
+
+    def _header_block(self, code: int, length: int, content_type: str = "application/json",
+                      extra_headers: Optional[Dict[str, str]] = None) -> bytes:
+        """Status line + all headers as one bytes block (replaces ~10 send_header calls)."""
+        self.log_request(code)
+        head = self._header_template(code, content_type) % (http_date(), length)
         if extra_headers:
-            for k, v in extra_headers.items():
-                self.send_header(k, v)
+            head += "".join("%s: %s\r\n" % kv for kv in extra_headers.items()).encode("latin-1")
+        return head + b"\r\n"
 
-        self.end_headers()
-        if body:
-            self.wfile.write(body)
+    def _send_response(self, code: int, body: bytes = b"", content_type: str = "application/json",
+                       extra_headers: Optional[Dict[str, str]] = None):
+        # single write: headers and body leave in one send
+        self.writer.write(self._header_block(code, len(body), content_type, extra_headers) + body)
+
+    async def _serve_file_sendfile(self, filepath: str, content_type: str) -> bool:
+        """
+        Send a regular file with sendfile(): bytes go kernel -> socket without a Python copy.
+        Returns False (nothing written) if the file can't be opened or isn't a regular file;
+        the single fstat gives both that check and Content-Length.
+        """
+        try:
+            # O_NONBLOCK: opening a FIFO must not hang the loop (no effect on regular files)
+            f = open(os.open(filepath, os.O_RDONLY | getattr(os, "O_NONBLOCK", 0)), "rb", buffering=0)
+        except OSError:
+            return False
+        with f:
+            st = os.fstat(f.fileno())
+            if not stat.S_ISREG(st.st_mode):
+                return False
+            size = st.st_size
+            # cork so the header block and the first file bytes share a packet
+            self._set_cork(True)
+            try:
+                self.writer.write(self._header_block(200, size, content_type=content_type))
+                if size:
+                    # loop.sendfile flushes the header, then loops os.sendfile on the
+                    # non-blocking socket (or falls back to reads + writes where unsupported)
+                    loop = asyncio.get_running_loop()
+                    if await loop.sendfile(self.writer.transport, f, 0, size) != size:
+                        # file shrank mid-send: the body is short of Content-Length, so the
+                        # client can only find the end of it by the connection closing
+                        self.close_connection = True
+            finally:
+                self._set_cork(False)
+        return True
 
-    def _serve_file(self, filepath: str) -> bool:
-        if not os.path.exists(filepath) or not os.path.isfile(filepath):
+    async def _serve_file(self, filepath: str) -> bool:
+        # SPA routes and probes for missing assets are answered from the negative cache
+        if not stat_cached(filepath)[0]:
             return False
         ctype, _ = mimetypes.guess_type(filepath)
         ctype = ctype or "application/octet-stream"
-        data = read_file_bytes(filepath)
-        if data is None:
-            return False
-        self._send_response(200, data, content_type=ctype)
-        return True
+        return await self._serve_file_sendfile(filepath, ctype)
 
-    def _serve_latest(self):
+    async def _serve_latest(self):
         data = read_latest_json_bytes()
         if data is None:
-            body = json.dumps({
+            body = json_dumps_bytes({
                 "error": "out/metrics.json not found (or not ready). Run monitor.sh first.",
                 "expected_path": LATEST_PATH
-            }).encode("utf-8")
+            })
             return self._send_response(404, body, content_type="application/json")
         return self._send_response(200, data, content_type="application/json")
 
-    def _serve_history_json(self, n: int):
-        items = parse_history_objects(HISTORY_PATH, max_items=n)
-        body = json.dumps({"count": len(items), "items": items}, ensure_ascii=False).encode("utf-8")
-        return self._send_response(200, body, content_type="application/json")
-
-    def _serve_history_jsonl(self, n: int):
-        items = parse_history_objects(HISTORY_PATH, max_items=n)
-        data = to_jsonl_bytes(items)
+    def _accepts_gzip(self) -> bool:
+        """True if Accept-Encoding allows gzip, by name or via "*", with a non-zero q."""
+        gzip_q = star_q = None
+        for token in self.headers.get("accept-encoding", "").split(","):
+            coding, _, params = token.partition(";")
+            coding = coding.strip().lower()
+            if coding not in ("gzip", "x-gzip", "*"):
+                continue
+            q = 1.0
+            for param in params.split(";"):
+                name, _, value = param.partition("=")
+                if name.strip().lower() == "q":
+                    try:
+                        q = float(value)
+                    except ValueError:
+                        q = 0.0
+            if coding == "*":
+                star_q = q
+            else:
+                gzip_q = q
+        # an explicit gzip entry overrides "*"
+        q = gzip_q if gzip_q is not None else star_q
+        return bool(q and q > 0)
+
+    async def _send_history(self, kind: str, n: int, content_type: str,
+                            extra_headers: Optional[Dict[str, str]] = None):
+        """
+        Send the last n history records rendered as kind ("json" / "jsonl").
+        Both the plain and the gzipped body are cached until metrics.jsonl changes,
+        so rendering and compression happen once per write, not once per poll.
+        Cache lookups run on the loop; only misses go to the thread pool.
+        """
+        loop = asyncio.get_running_loop()
+        st_key = history_stat_key(HISTORY_PATH)
+        key = (kind, HISTORY_PATH, st_key, n)
+        body = _cache_get(key) if st_key else None
+        if body is None:
+            body = await loop.run_in_executor(None, render_history, kind, HISTORY_PATH, n)
+            if st_key:
+                _cache_put(key, body)
+
+        headers = dict(extra_headers or {})
+        headers["Vary"] = "Accept-Encoding"
+        if self._accepts_gzip():
+            gz_key = (kind + ".gz", HISTORY_PATH, st_key, n)
+            gz_body = _cache_get(gz_key) if st_key else None
+            if gz_body is None:
+                gz_body = await loop.run_in_executor(None, gzip.compress, body, GZIP_LEVEL)
+                if st_key:
+                    _cache_put(gz_key, gz_body)
+            body = gz_body
+            headers["Content-Encoding"] = "gzip"
+        return self._send_response(200, body, content_type=content_type, extra_headers=headers)
+
+    async def _serve_history_json(self, n: int):
+        return await self._send_history("json", n, content_type="application/json")
+
+    async def _serve_history_jsonl(self, n: int):
         headers = {"Content-Disposition": 'attachment; filename="metrics.jsonl"'}
-        return self._send_response(200, data, content_type="application/x-ndjson", extra_headers=headers)
+        return await self._send_history("jsonl", n, content_type="application/x-ndjson", extra_headers=headers)
 
-    def do_OPTIONS(self):
+    async def do_OPTIONS(self):
         self._send_response(204, b"", content_type="text/plain", extra_headers={
             "Access-Control-Allow-Methods": "GET, OPTIONS",
             "Access-Control-Allow-Headers": "Content-Type",
         })
 
-    def do_GET(self):
-        parsed = urllib.parse.urlparse(self.path)
-        path = parsed.path
-        qs = urllib.parse.parse_qs(parsed.query)
+    # -----------------------------
+    # Routes: async handler(self, query)
+    # -----------------------------
+    @staticmethod
+    def _query_n(query: str) -> int:
+        # only n= is ever read, so skip parse_qs and its dict of lists
+        n = 50
+        for part in query.split("&") if query else ():
+            if part.startswith("n="):
+                try:
+                    n = int(part[2:])
+                except ValueError:
+                    pass
+                break
+        return max(1, min(n, 500))
 
-        # API
-        if path in ("/api/latest", "/metrics.json"):
-            return self._serve_latest()
-
-        if path == "/api/health":
-            body = json.dumps({
-                "ok": True,
-                "latest_exists": os.path.exists(LATEST_PATH),
-                "history_exists": os.path.exists(HISTORY_PATH),
-                "latest_path": LATEST_PATH,
-                "history_path": HISTORY_PATH,
-            }).encode("utf-8")
-            return self._send_response(200, body, content_type="application/json")
-
-        if path == "/api/history":
-            try:
-                n = int(qs.get("n", ["50"])[0])
-            except Exception:
-                n = 50
-            n = max(1, min(n, 500))
-            return self._serve_history_json(n)
+    async def _route_latest(self, query: str):
+        return await self._serve_latest()
 
-        if path == "/api/history.jsonl":
-            try:
-                n = int(qs.get("n", ["50"])[0])
-            except Exception:
-                n = 50
-            n = max(1, min(n, 500))
-            return self._serve_history_jsonl(n)
+    async def _route_health(self, query: str):
+        return self._send_response(200, health_json_bytes(), content_type="application/json")
+
+    async def _route_history(self, query: str):
+        return await self._serve_history_json(self._query_n(query))
+
+    async def _route_history_jsonl(self, query: str):
+        return await self._serve_history_jsonl(self._query_n(query))
+
+    async def _route_index(self, query: str):
+        if await self._serve_file(os.path.join(WEB_DIR, "index.html")):
+            return
+        return self._send_response(404, b"index.html not found", content_type="text/plain")
+
+    async def _route_favicon(self, query: str):
+        return self._send_response(204, b"", content_type="text/plain")
 
+    # exact path -> handler (one dict lookup per request)
+    EXACT_ROUTES = {
+        # API
+        "/api/latest": _route_latest,
+        "/metrics.json": _route_latest,
+        "/api/health": _route_health,
+        "/api/history": _route_history,
+        "/api/history.jsonl": _route_history_jsonl,
         # Dashboard
-        if path in ("/", "/index.html"):
-            index_path = os.path.join(WEB_DIR, "index.html")
-            if self._serve_file(index_path):
-                return
-            return self._send_response(404, b"index.html not found", content_type="text/plain")
-
-        # Static folders
-        if path.startswith("/css/"):
-            rel = path[len("/css/"):]
-            file_path = os.path.join(WEB_DIR, "css", rel)
-            if self._serve_file(file_path):
-                return
-            return self._send_response(404, b"Not Found", content_type="text/plain")
-
-        if path.startswith("/js/"):
-            rel = path[len("/js/"):]
-            file_path = os.path.join(WEB_DIR, "js", rel)
-            if self._serve_file(file_path):
-                return
-            return self._send_response(404, b"Not Found", content_type="text/plain")
-
-        if path == "/favicon.ico":
-            return self._send_response(204, b"", content_type="text/plain")
+        "/": _route_index,
+        "/index.html": _route_index,
+        "/favicon.ico": _route_favicon,
+    }
+
+    # Static folders: (url prefix, directory)
+    PREFIX_ROUTES = (
+        ("/css/", os.path.join(WEB_DIR, "css")),
+        ("/js/", os.path.join(WEB_DIR, "js")),
+    )
+
+    async def do_GET(self):
+        parsed = urllib.parse.urlparse(self.path)
+        path = parsed.path
+
+        handler = self.EXACT_ROUTES.get(path)
+        if handler is not None:
+            return await handler(self, parsed.query)
+
+        for prefix, folder in self.PREFIX_ROUTES:
+            if path.startswith(prefix):
+                if await self._serve_file(os.path.join(folder, path[len(prefix):])):
+                    return
+                return self._send_response(404, b"Not Found", content_type="text/plain")
 
         # Fallback: serve any file inside WEB_DIR
         candidate = os.path.join(WEB_DIR, path.lstrip("/"))
-        if self._serve_file(candidate):
+        if await self._serve_file(candidate):
             return
 
         # SPA fallback
         index_path = os.path.join(WEB_DIR, "index.html")
-        if os.path.exists(index_path) and self._serve_file(index_path):
+        if await self._serve_file(index_path):
             return
 
         self._send_response(404, b"Not Found", content_type="text/plain")
 
 
-class ThreadingTCPServer(socketserver.ThreadingMixIn, socketserver.TCPServer):
-    daemon_threads = True
-    allow_reuse_address = True
+async def _client_connected(reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+    await RequestHandler(reader, writer).handle()
+
+
+async def serve():
+    server = await asyncio.start_server(_client_connected, HOST, PORT, backlog=LISTEN_BACKLOG)
+    print(f"Serving on http://{HOST}:{PORT}")
+    print(f"- Web:    {WEB_DIR}")
+    print(f"- Out:    {OUT_DIR}")
+    print(f"- Latest: {LATEST_PATH}")
+    print(f"- Hist:   {HISTORY_PATH}")
+    async with server:
+        await server.serve_forever()
 
 
 def run():
     os.makedirs(OUT_DIR, exist_ok=True)
     os.makedirs(WEB_DIR, exist_ok=True)
 
-    with ThreadingTCPServer((HOST, PORT), RequestHandler) as httpd:
-        print(f"Serving on http://{HOST}:{PORT}")
-        print(f"- Web:    {WEB_DIR}")
-        print(f"- Out:    {OUT_DIR}")
-        print(f"- Latest: {LATEST_PATH}")
-        print(f"- Hist:   {HISTORY_PATH}")
-        try:
-            httpd.serve_forever()
-        except KeyboardInterrupt:
-            print("Shutting down")
+    try:
+        asyncio.run(serve())
+    except KeyboardInterrupt:
+        print("Shutting down")
+    finally:
+        shutdown_render_pool()
 
 
 if __name__ == "__main__":